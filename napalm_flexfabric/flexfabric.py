@@ -16,10 +16,7 @@ Napalm driver for HP FlexFabric devices
 Read https://napalm.readthedocs.io for more information.
 """
 
-from __future__ import print_function
-from __future__ import unicode_literals
-
-from netmiko import ConnectHandler, FileTransfer, InLineTransfer
+from netmiko import ConnectHandler
 from napalm.base.base import NetworkDriver
 from napalm.base.exceptions import (
     CommandErrorException,
@@ -27,16 +24,13 @@ from napalm.base.exceptions import (
     ConnectionException,
 )
 
-#only attempt to import py23_compat if python version less than 3
-import sys
-if sys.version_info[0] < 3:
-    from napalm.base.utils import py23_compat
-
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 import napalm.base.constants as C
 import napalm.base.helpers
 import re
 import socket
-import string
+import time
 
 
 # Constants
@@ -45,6 +39,70 @@ DAY_SECONDS = 24 * HOUR_SECONDS
 WEEK_SECONDS = 7 * DAY_SECONDS
 YEAR_SECONDS = 365 * DAY_SECONDS
 
+# Sent by is_alive() to keep the SSH session alive
+_NULL_BYTE = "\x00"
+# Seconds to wait between two empty reads of the SSH channel
+_READ_DELAY = 0.05
+# Seconds without output after which the SSH channel counts as quiet
+_QUIET_PERIOD = 2
+
+# Seconds per unit as reported in uptime strings ("1 week, 2 days, 3 hours")
+_UNITS = {
+    "year": YEAR_SECONDS,
+    "week": WEEK_SECONDS,
+    "day": DAY_SECONDS,
+    "hour": HOUR_SECONDS,
+    "minute": 60,
+    "second": 1,
+}
+# The leading \b keeps the scan linear: a failed match is not retried
+# from every digit inside the same number.
+_UPTIME_RE = re.compile(
+    r"\b(\d+)\s*(year|week|day|hour|minute|second)", re.ASCII
+)
+# Section headers and serial number lines of "display device manuinfo"
+_MANUINFO_RE = re.compile(
+    r"^(?:(?P<header>(?! ).*(?:Chassis self|Slot).*|.*Slot.*CPU.*|.*CPU.*Slot.*)"
+    r"|[^:\n]*DEVICE_SERIAL_NUMBER[^:\n]*:(?P<serial>[^:\r\n]*).*)$",
+    re.M,
+)
+# "<model> uptime is <uptime>" line of "display version"
+_UPTIME_LINE_RE = re.compile(r"^(.*?) uptime is ([^\r\n]*)", re.M)
+# Lines of "display version" that carry the software version
+_OS_VERSION_RE = re.compile(
+    r"^[^\r\n]*(?:System image version|Comware Software, Version)[^\r\n]*", re.M
+)
+# Configured hostname, anchored so "sysname" elsewhere in a line is ignored
+_SYSNAME_RE = re.compile(r"^[ \t]*sysname[ \t]+([^\r\n]*\S)", re.M)
+# First column of every row in "display interface brief"
+_IFACE_RE = re.compile(r"^(\S+)", re.M)
+
+# Long interface name prefixes and their standard abbreviations
+_IFACE_MAP = (
+    ("Ten-GigabitEthernet", "XGE"),
+    ("FortyGigE", "FGE"),
+    ("M-GigabitEthernet", "MGE"),
+    ("Bridge-Aggregation", "BAGG"),
+    ("HundredGigE", "HGE"),
+    ("InLoopBack", "InLoop"),
+    ("LoopBack", "Loop"),
+    ("Multicast Tunnel", "MTunnel"),
+    ("Register-Tunnel", "REG"),
+    ("Route-Aggregation", "RAGG"),
+    ("SAN-Aggregation", "SAGG"),
+    ("S-Channel", "S-Ch"),
+    ("Schannel-Aggregation", "SCH-AGG"),
+    ("Schannel-Bundle", "SCH-B"),
+    ("Tunnel", "Tun"),
+    ("Vsi-interface", "Vsi"),
+    ("Vlan-interface", "Vlan-int"),
+)
+# _IFACE_MAP bucketed on the first character, longest prefix first
+_IFACE_BY_FIRST = {}
+for _prefix, _short in sorted(_IFACE_MAP, key=lambda item: -len(item[0])):
+    _IFACE_BY_FIRST.setdefault(_prefix[0], []).append((_prefix, _short))
+del _prefix, _short
+
 class FlexFabricDriver(NetworkDriver):
     """Napalm driver for HPE FlexFabric Switches"""
 
@@ -72,19 +130,27 @@ class FlexFabricDriver(NetworkDriver):
             'alt_host_keys': False,
             'alt_key_file': '',
             'ssh_config_file': None,
+            'fast_cli': False,
         }
 
         # Build dict of any optional Netmiko args
-        self.netmiko_optional_args = {}
-        for key, value in netmiko_argument_map.items():
-            try:
-                self.netmiko_optional_args[key] = optional_args[key]
-            except KeyError:
-                pass
+        self.netmiko_optional_args = {
+            key: optional_args[key]
+            for key in netmiko_argument_map
+            if key in optional_args
+        }
+        # passed explicitly, the Netmiko default differs between releases
+        self.netmiko_optional_args.setdefault(
+            'fast_cli', netmiko_argument_map['fast_cli'])
         self.global_delay_factor = optional_args.get('global_delay_factor', 1)
         self.port = optional_args.get('port', 22)
 
+        # Seconds a command output is reused, 0 disables the cache
+        self.cmd_cache_ttl = optional_args.get('cmd_cache_ttl', 0)
+        self._cmd_cache = {}
+
         self.device = None
+        self._prompt_re = None
         self.config_replace = False
         self.interface_map = {}
 
@@ -99,29 +165,189 @@ class FlexFabricDriver(NetworkDriver):
             username=self.username,
             password=self.password,
             **self.netmiko_optional_args)
+        self._prompt_re = None
+        self._cmd_cache = {}
         # ensure in enable mode
         self.device.enable()
 
     def close(self):
         """Close the connection to the device."""
         self.device.disconnect()
+        self._cmd_cache = {}
+
+    @classmethod
+    def open_many(cls, specs, max_workers=32):
+        """
+        Open the connections to several devices in parallel.
+        specs is an iterable of dicts with the constructor arguments
+        of each device. Return a dict of opened drivers keyed by hostname,
+        so every hostname may only appear once.
+        If any device fails to open, the others are closed again and
+        the first error is raised.
+        """
+        specs = list(specs)
+        hostnames = set()
+        for spec in specs:
+            if spec["hostname"] in hostnames:
+                raise ValueError("Duplicate hostname: {}".format(spec["hostname"]))
+            hostnames.add(spec["hostname"])
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(cls._open_one, spec): spec["hostname"]
+                for spec in specs
+            }
+
+        drivers = {}
+        error = None
+        for future, hostname in futures.items():
+            try:
+                drivers[hostname] = future.result()
+            except Exception as e:
+                error = error or e
+        if error is not None:
+            for driver in drivers.values():
+                try:
+                    driver.close()
+                except Exception:
+                    # keep closing the others, the open error is raised below
+                    pass
+            raise error
+        return drivers
+
+    @classmethod
+    def _open_one(cls, spec):
+        """
+        Create a driver from spec and open its connection.
+        If open() fails after the SSH session was set up, e.g. in
+        enable(), the session is disconnected before the error is raised.
+        """
+        driver = cls(**spec)
+        try:
+            driver.open()
+        except Exception:
+            if driver.device is not None:
+                try:
+                    driver.device.disconnect()
+                except Exception:
+                    pass
+            raise
+        return driver
 
     def _send_command(self, command):
-        """Wrapper for self.device.send.command().
-        If command is a list will iterate through commands until valid command.
+        """Send command for a getter.
+        The output is served from the command cache while it is fresh.
         """
+        output = self._cached_output(command)
+        if output is None:
+            output = self._send_command_uncached(command)
+            self._cache_output(command, output)
+        return output
+
+    def _send_command_uncached(self, command):
+        """Wrapper for self.device.send.command()."""
         try:
-            if isinstance(command, list):
-                for cmd in command:
-                    output = self.device.send_command(cmd)
-                    if "Invalid input: " not in output:
-                        break
-            else:
-                output = self.device.send_command(command)
-            return output
+            return self.device.send_command(command)
         except (socket.error, EOFError) as e:
             raise ConnectionClosedException(str(e))
 
+    def _cached_output(self, command):
+        """
+        Return the cached output of command, or None if the cache
+        is disabled or holds no output younger than cmd_cache_ttl.
+        """
+        if not self.cmd_cache_ttl:
+            return None
+        entry = self._cmd_cache.get(command)
+        if entry is not None and time.monotonic() - entry[0] < self.cmd_cache_ttl:
+            return entry[1]
+        return None
+
+    def _cache_output(self, command, output):
+        """Remember the output of command if the cache is enabled."""
+        if self.cmd_cache_ttl:
+            self._cmd_cache[command] = (time.monotonic(), output)
+
+    def _send_commands_batched(self, commands):
+        """
+        Send several commands in a single write to save round-trips.
+        Return the outputs in the same order as the commands.
+        The channel is read until the device printed one prompt per
+        command or went quiet, so no output is still in flight once
+        it is split. Commands whose echo does not start their chunk
+        are sent again one by one after the buffer was cleared.
+        Outputs still in the command cache are not sent at all.
+        """
+        outputs = {}
+        for command in commands:
+            output = self._cached_output(command)
+            if output is not None:
+                outputs[command] = output
+        pending = [command for command in commands if command not in outputs]
+
+        if len(pending) > 1:
+            if self._prompt_re is None:
+                # <hostname> in user view, [hostname] in system view
+                self._prompt_re = re.compile(
+                    r"^[<\[]{}[>\]]".format(re.escape(self.device.base_prompt)), re.M
+                )
+            try:
+                self.device.clear_buffer()
+                self.device.write_channel(
+                    "".join(command + self.device.RETURN for command in pending)
+                )
+                output = self._read_until_prompts(len(pending))
+            except (socket.error, EOFError) as e:
+                raise ConnectionClosedException(str(e))
+
+            # the n-th complete chunk answers the n-th command, as long
+            # as the device echoed that command in front of it
+            chunks = self._prompt_re.split(output)[:-1]
+            for command, chunk in zip(pending, chunks):
+                echo, _, body = chunk.partition("\n")
+                if echo.strip() == command and command not in outputs:
+                    outputs[command] = body.rstrip("\n")
+                    self._cache_output(command, outputs[command])
+            if any(command not in outputs for command in pending):
+                self.device.clear_buffer()
+
+        for command in pending:
+            if command not in outputs:
+                outputs[command] = self._send_command(command)
+        return [outputs[command] for command in commands]
+
+    def _read_until_prompts(self, count):
+        """
+        Read the channel until the device printed count prompts.
+        After self.timeout seconds reading stops as soon as the channel
+        is quiet for _QUIET_PERIOD seconds; if it is still not quiet
+        after twice the timeout, CommandErrorException is raised.
+        Return everything read.
+        """
+        output = ""
+        prompts = 0
+        last_data = time.monotonic()
+        deadline = last_data + self.timeout
+        while prompts < count:
+            now = time.monotonic()
+            if now > deadline + self.timeout:
+                raise CommandErrorException(
+                    "Device output did not settle within {} seconds".format(2 * self.timeout)
+                )
+            if now > deadline and now - last_data > _QUIET_PERIOD:
+                break
+            data = self.device.read_channel()
+            if not data:
+                time.sleep(_READ_DELAY)
+                continue
+            last_data = now
+            # rescan the last partial line, a prompt may span two reads
+            start = output.rfind("\n") + 1
+            prompts -= len(self._prompt_re.findall(output, start))
+            output += data
+            prompts += len(self._prompt_re.findall(output, start))
+        return self.device.normalize_linefeeds(output)
+
     def is_alive(self):
         """ Returns a flag with the state of the connection."""
         if self.device is None:
@@ -129,8 +355,7 @@ class FlexFabricDriver(NetworkDriver):
         try:
             # SSH
             # Try sending ASCII null byte to maintain the connection alive
-            null = chr(0)
-            self.device.write_channel(null)
+            self.device.write_channel(_NULL_BYTE)
             return {
                 'is_alive': self.device.remote_conn.transport.is_active()
             }
@@ -143,17 +368,11 @@ class FlexFabricDriver(NetworkDriver):
         Execute a list of commands and return the output in a dictionary format
         using the command as the key.
         """
-        cli_output = dict()
-        if type(commands) is not list:
+        if isinstance(commands, (str, bytes)):
             raise TypeError('Please enter a valid list of commands!')
 
-        for command in commands:
-            output = self._send_command(command)
-            if sys.version_info[0] < 3:
-                cli_output[py23_compat.text_type(command)] = output
-            else:
-                cli_output = output
-        return cli_output
+        # always sent to the device, cli() may run commands with side effects
+        return {command: self._send_command_uncached(command) for command in commands}
 
     def get_facts(self):
         """Return a set of facts from the devices."""
@@ -163,78 +382,67 @@ class FlexFabricDriver(NetworkDriver):
         serial_number, fqdn, os_version, hostname, domain_name, model = ("",) * 6
 
         # obtain output from device
-        display_dev = self._send_command("display device manuinfo")
-        display_ver = self._send_command("display version")
-        display_curr_conf = self._send_command("display current-configuration | include sysname")
-        display_domain = self._send_command("display domain | include Domain")
-        display_interface = self._send_command("display interface brief")
+        (display_dev, display_ver, display_curr_conf, display_domain,
+         display_interface) = self._send_commands_batched([
+            "display device manuinfo",
+            "display version",
+            "display current-configuration | include sysname",
+            "display domain | include Domain",
+            "display interface brief",
+        ])
 
         # serial number
+        serials = []
         chassis = False
-        for line in display_dev.splitlines():
-            if not line.startswith(" ") and ("Chassis self" in line or "Slot" in line)\
-            or ("Slot" in line and "CPU" in line):
+        for match in _MANUINFO_RE.finditer(display_dev):
+            if match.group("header") is not None:
                 chassis = True
-            if chassis and "DEVICE_SERIAL_NUMBER" in line:
-                serial_number += (line.split(":")[1])
+            elif chassis:
+                serials.append(match.group("serial"))
                 chassis = False
-        serial_number = serial_number.strip()
-
-        # uptime/model/os_version
-        for line in display_ver.splitlines():
-            if " uptime is " in line:
-                model, uptime_str = line.split(" uptime is ")
-                uptime = self.parse_uptime(uptime_str)
-                model = model.strip()
-
+        serial_number = "".join(serials).strip()
+
+        # uptime/model
+        match = _UPTIME_LINE_RE.search(display_ver)
+        if match:
+            model = match.group(1).strip()
+            uptime = self.parse_uptime(match.group(2))
+
+        # os_version, the last matching line wins
+        version_lines = _OS_VERSION_RE.findall(display_ver)
+        if version_lines:
+            line = version_lines[-1]
             if "System image version" in line:
                 os_version = line.split(":")[1].strip()
-            elif "Comware Software, Version" in line:
+            else:
                 os_version = line.lstrip("Comware Software, Version")
 
         # hostname
-        hostname = display_curr_conf.split("sysname")[1].strip()
+        match = _SYSNAME_RE.search(display_curr_conf)
+        hostname = match.group(1) if match else ""
 
         # domain name
-        domain_name = display_domain.splitlines()[0].split(":")[1].strip()
+        domain_name = display_domain.partition("\n")[0].partition(":")[2].strip()
 
         #fqdn
-        if domain_name != "system":
-            fqdn = "{}.{}".format(hostname, domain_name)
-        else:
-            fqdn = hostname
+        fqdn = f"{hostname}.{domain_name}" if domain_name != "system" else hostname
 
         #interface list
         interface_list = []
-        active = False
-        for line in display_interface.splitlines():
-            if line.startswith("Interface            Link Speed"):
-                active = True
-                continue
-            if active:
-                interface_list.append(line.split()[0])
-        if sys.version_info[0] < 3:
-            return {
-                "uptime": int(uptime),
-                "vendor": vendor,
-                "os_version": py23_compat.text_type(os_version),
-                "serial_number": py23_compat.text_type(serial_number),
-                "model": py23_compat.text_type(model),
-                "hostname": py23_compat.text_type(hostname),
-                "fqdn": fqdn,
-                "interface_list": interface_list,
-            }
-        else:
-            return {
-                "uptime": int(uptime),
-                "vendor": vendor,
-                "os_version": os_version,
-                "serial_number": serial_number,
-                "model": model,
-                "hostname": hostname,
-                "fqdn": fqdn,
-                "interface_list": interface_list,
-            }
+        start = display_interface.find("Interface            Link Speed")
+        if start != -1:
+            # skip the header
+            interface_list = _IFACE_RE.findall(display_interface, start)[1:]
+        return {
+            "uptime": int(uptime),
+            "vendor": vendor,
+            "os_version": os_version,
+            "serial_number": serial_number,
+            "model": model,
+            "hostname": hostname,
+            "fqdn": fqdn,
+            "interface_list": interface_list,
+        }
 
 
     def get_lldp_neighbors(self):
@@ -242,23 +450,8 @@ class FlexFabricDriver(NetworkDriver):
         lldp = {}
         command = "display lldp neighbor-information list"
         output = self._send_command(command)
-        active = False
-        for line in output.splitlines():
-            if line.startswith("System Name"):
-                active = True
-                continue
-            if active:
-                remote_sys, local_if, _, remote_port = line.split()
-                lldp[local_if] = [{"hostname": remote_sys, "port": remote_port}]
-        if not lldp:
-            for line in output.splitlines():
-                if line.startswith("Local Interface"):
-                    active = True
-                    continue
-                if active:
-                    split_line = line.split()
-                    local_if, remote_port, remote_sys = split_line[0], split_line[-2], split_line[-1]
-                    lldp[local_if] = [{"hostname": remote_sys, "port": remote_port}]
+        for local_if, remote_sys, remote_port in self._iter_lldp_neighbors(output):
+            lldp[local_if] = [{"hostname": remote_sys, "port": remote_port}]
 
         return lldp
 
@@ -284,23 +477,8 @@ class FlexFabricDriver(NetworkDriver):
         else:   #if didn't specify interface
             command = "display lldp neighbor-information list"
             output = self._send_command(command)
-            active = False
-            for line in output.splitlines():
-                if line.startswith("System Name"):
-                    active = True
-                    continue
-                if active:
-                    remote_sys, local_if, _, remote_port = line.split()
-                    lldp[local_if] = [{"remote_system_name": remote_sys, "remote_port": remote_port}]
-            if not lldp:
-                for line in output.splitlines():
-                    if line.startswith("Local Interface"):
-                        active = True
-                        continue
-                    if active:
-                        split_line = line.split()
-                        local_if, remote_port, remote_sys = split_line[0], split_line[-2], split_line[-1]
-                        lldp[local_if] = [{ "remote_system_name": remote_sys, "remote_port": remote_port}]
+            for local_if, remote_sys, remote_port in self._iter_lldp_neighbors(output):
+                lldp[local_if] = [{"remote_system_name": remote_sys, "remote_port": remote_port}]
         return lldp
 
 
@@ -317,54 +495,49 @@ class FlexFabricDriver(NetworkDriver):
         fan_cmd = "display fan"
         pwr_cmd = "display power"
 
+        fan_output, temp_output, cpu_output, mem_output = self._send_commands_batched(
+            [fan_cmd, temp_cmd, cpu_cmd, mem_cmd]
+        )
+
         # fan health
-        output = self._send_command(fan_cmd)
-        environment.setdefault("fans", {})
+        # the output is either a table per chassis below a " ---" line or
+        # a "Fan n:" / "State: ..." block per fan, the block form is only
+        # parsed if the table form yielded no fans
+        lines = fan_output.splitlines()
+        fans = {}
         active = False
         chassis = 0
-        for line in output.splitlines():
+        for line in lines:
             if line.startswith(" ---"):
                 active = True
                 chassis +=1
-                continue
             elif line == "" or line.startswith(" Fan-tray"):
                 active = False
-                continue
-            elif active == False:
-                continue
-            line_list = line.split()
-            if line_list[1] != "Normal":
-                fan_state = False
-            else:
-                fan_state = True
-            fan_id = str(chassis) + "_" + line_list[0]
-            environment["fans"][fan_id] = {
-                "status": fan_state
-            }
-        if not environment["fans"]:
-            for line in output.splitlines():
+            elif active:
+                line_list = line.split()
+                fans[f"{chassis}_{line_list[0]}"] = {
+                    "status": line_list[1] == "Normal"
+                }
+        if not fans:
+            fan_id = None
+            for line in lines:
                 if line.startswith("Slot") or line.startswith(" Slot"):
                     chassis +=1
-                    continue
                 elif "FAN" in line or "Fan " in line:
-                    fan_id = str(chassis) + "_" + line.split()[1].strip(":")
-                    continue
-                elif "State" in line:
-                    if line.split(":")[-1].strip() != "Normal":
-                        fan_state = False
-                    else:
-                        fan_state = True
-                    environment["fans"][fan_id] = {
-                        "status": fan_state
+                    fan_id = f"{chassis}_{line.split()[1].strip(':')}"
+                elif "State" in line and fan_id is not None:
+                    fans[fan_id] = {
+                        "status": line.split(":")[-1].strip() == "Normal"
                     }
+        environment["fans"] = fans
 
         # temperature sensors
-        output = self._send_command(temp_cmd)
+        lines = temp_output.splitlines()
         environment.setdefault("temperature", {})
-        if "Slot" in output.splitlines()[0]:
+        if "Slot" in lines[0]:
             slot = 0
             active = False
-            for line in output.splitlines():
+            for line in lines:
                 if "Slot" in line:
                     slot += 1
                     active = False
@@ -374,7 +547,7 @@ class FlexFabricDriver(NetworkDriver):
                     continue
                 if active:
                     split_line = line.split()
-                    location = str(slot) + "_" + "_".join(split_line[0:2])
+                    location = f"{slot}_{split_line[0]}_{split_line[1]}"
                     temperature = float(split_line[2])
                     environment["temperature"][location] = {
                         "temperature": temperature,
@@ -382,11 +555,11 @@ class FlexFabricDriver(NetworkDriver):
                         "is_critical": temperature > float(split_line[-2])
                     }
         else:
-            if "Chassis" in output.splitlines()[2]:
+            if "Chassis" in lines[2]:
                 marker = 4
             else:
                 marker = 3
-            for line in output.splitlines()[3:]:
+            for line in lines[3:]:
                 split_line = line.split()
                 location = "_".join(split_line[0:marker])
                 temperature = float(split_line[marker])
@@ -403,31 +576,27 @@ class FlexFabricDriver(NetworkDriver):
         #TODO
 
         # cpu usage
-        output = self._send_command(cpu_cmd)
         environment.setdefault("cpu", {})
-        usage = 0.0
-        if "Wrong parameter found at" in output:
+        if "Wrong parameter found at" in cpu_output:
             output = self._send_command("display cpu-usage | include 1 minute")
             for idx, line in enumerate(output.splitlines()):
-                environment["cpu"][idx] = {}
-                environment["cpu"][idx]["%usage"] = 0.0
-                usage = float(line.split()[0].strip("%"))
-                environment["cpu"][idx]["%usage"] = usage
+                environment["cpu"][idx] = {
+                    "%usage": float(line.split(None, 1)[0].rstrip("%"))
+                }
         else:
-            if "Chassis" in output.splitlines()[0]:
+            lines = cpu_output.splitlines()
+            if "Chassis" in lines[0]:
                 marker = 4
             else:
                 marker = 3
-            for idx, line in enumerate(output.splitlines()[1:]):
-                environment["cpu"][idx] = {}
-                environment["cpu"][idx]["%usage"] = 0.0
-                usage = float(line.split()[marker].strip("%"))
-                environment["cpu"][idx]["%usage"] = usage
+            for idx, line in enumerate(lines[1:]):
+                environment["cpu"][idx] = {
+                    "%usage": float(line.split()[marker].rstrip("%"))
+                }
 
         # memory usage
-        output = self._send_command(mem_cmd)
         environment.setdefault("memory", {})
-        if "Too many parameters found at" in output:
+        if "Too many parameters found at" in mem_output:
             output = self._send_command("display memory")
             for line in output.splitlines():
                 if "Total Memory" in line:
@@ -435,15 +604,17 @@ class FlexFabricDriver(NetworkDriver):
                 elif "Used Memory" in line:
                     used = int(line.split(":")[-1].strip())
         else:
-            if "Chassis" in output.splitlines()[1]:
+            lines = mem_output.splitlines()
+            if "Chassis" in lines[1]:
                 marker = 1
             else:
                 marker = 0
             total = 0
             used = 0
-            for line in output.splitlines()[2:]:
-                total += int(line.split()[2 + marker])
-                used += int(line.split()[3 + marker])
+            for line in lines[2:]:
+                parts = line.split()
+                total += int(parts[2 + marker])
+                used += int(parts[3 + marker])
         environment["memory"]["used_ram"] = used
         environment["memory"]["available_ram"] = total
 
@@ -458,28 +629,13 @@ class FlexFabricDriver(NetworkDriver):
         if retrieve == "all" or get_startup or get_running:
             command1 = "display current-configuration"
             command2 = "display saved-configuration"
-            output1 = self._send_command(command1)
-            output2 = self._send_command(command2)
-            if sys.version_info[0] < 3:
-                return{
-                    "startup": py23_compat.text_type(output2)
-                    if get_startup
-                    else "",
-                    "running": py23_compat.text_type(output1)
-                    if get_running
-                    else "",
-                    "candidate": ""
-                }
-            else:
-                return{
-                    "startup": output2
-                    if get_startup
-                    else "",
-                    "running": output1
-                    if get_running
-                    else "",
-                    "candidate": "Not supported in Comware"
-                }
+            output1 = self._send_command(command1) if get_running else ""
+            output2 = self._send_command(command2) if get_startup else ""
+            return{
+                "startup": output2,
+                "running": output1,
+                "candidate": "Not supported in Comware"
+            }
         else:
             return {"startup": "", "running": "", "candidate": ""}
 
@@ -505,9 +661,12 @@ class FlexFabricDriver(NetworkDriver):
                 name_not_set = True
                 continue
             elif name_not_set:
-                interface = self._short_interface(line.split()[0])
+                interface = self._short_interface(line.split(None, 1)[0])
                 interfaces[interface] = {}
                 name_not_set = False
+            # every field read below is on a "key: value" line
+            if ":" not in line:
+                continue
             if "Current state:" in line or "current state:" in line:
                 state = line.split()[-1]
                 if state == "UP":
@@ -537,79 +696,47 @@ class FlexFabricDriver(NetworkDriver):
         return
 
     @staticmethod
+    @lru_cache(maxsize=256)
     def parse_uptime(uptime_str):
         """
         Extract the uptime string from the given Cisco IOS Device.
         Return the uptime in seconds as an integer
         """
-        # Initialize to zero
-        (years, weeks, days, hours, minutes, seconds) = (0, 0, 0, 0, 0, 0)
-
-        uptime_str = uptime_str.strip()
-        time_list = uptime_str.split(",")
-        for element in time_list:
-            if re.search("year", element):
-                years = int(element.split()[0])
-            elif re.search("week", element):
-                weeks = int(element.split()[0])
-            elif re.search("day", element):
-                days = int(element.split()[0])
-            elif re.search("hour", element):
-                hours = int(element.split()[0])
-            elif re.search("minute", element):
-                minutes = int(element.split()[0])
-            elif re.search("second", element):
-                seconds = int(element.split()[0])
-
-        uptime_sec = (
-            (years * YEAR_SECONDS)
-            + (weeks * WEEK_SECONDS)
-            + (days * DAY_SECONDS)
-            + (hours * 3600)
-            + (minutes * 60)
-            + seconds
-        )
+        uptime_sec = 0
+        for count, unit in _UPTIME_RE.findall(uptime_str):
+            uptime_sec += int(count) * _UNITS[unit]
         return uptime_sec
 
+    @staticmethod
+    def _iter_lldp_neighbors(output):
+        """
+        Parse the output of "display lldp neighbor-information list"
+        in a single pass. The column order depends on the header the
+        device prints, yield (local_if, remote_sys, remote_port)
+        """
+        layout = None
+        for line in output.splitlines():
+            if layout is None:
+                if line.startswith("System Name"):
+                    layout = "system_name"
+                elif line.startswith("Local Interface"):
+                    layout = "local_interface"
+                continue
+            if layout == "system_name":
+                remote_sys, local_if, _, remote_port = line.split()
+            else:
+                split_line = line.split()
+                local_if, remote_port, remote_sys = split_line[0], split_line[-2], split_line[-1]
+            yield local_if, remote_sys, remote_port
+
     @staticmethod
     def _short_interface(interface):
         """
         Remove lower case characters from interface
         name to get standard interface names
         """
-        if interface.startswith("Ten-GigabitEthernet"):
-            interface = interface.replace("Ten-GigabitEthernet", "XGE")
-        elif interface.startswith("FortyGigE"):
-            interface = interface.replace("FortyGigE", "FGE")
-        elif interface.startswith("M-GigabitEthernet"):
-            interface = interface.replace("M-GigabitEthernet","MGE")
-        elif interface.startswith("Bridge-Aggregation"):
-            interface = interface.replace("Bridge-Aggregation","BAGG")
-        elif interface.startswith("HundredGigE"):
-            interface = interface.replace("HundredGigE","HGE")
-        elif interface.startswith("InLoopBack"):
-            interface = interface.replace("InLoopBack","InLoop")
-        elif interface.startswith("LoopBack"):
-            interface = interface.replace("LoopBack","Loop")
-        elif interface.startswith("Multicast Tunnel"):
-            interface = interface.replace("Multicast Tunnel","MTunnel")
-        elif interface.startswith("Register-Tunnel"):
-            interface = interface.replace("Register-Tunnel","REG")
-        elif interface.startswith("Route-Aggregation"):
-            interface = interface.replace("Route-Aggregation","RAGG")
-        elif interface.startswith("SAN-Aggregation"):
-            interface = interface.replace("SAN-Aggregation","SAGG")
-        elif interface.startswith("S-Channel"):
-            interface = interface.replace("S-Channel","S-Ch")
-        elif interface.startswith("Schannel-Aggregation"):
-            interface = interface.replace("Schannel-Aggregation","SCH-AGG")
-        elif interface.startswith("Schannel-Bundle"):
-            interface = interface.replace("Schannel-Bundle","SCH-B")
-        elif interface.startswith("Tunnel"):
-            interface = interface.replace("Tunnel","Tun")
-        elif interface.startswith("Vsi-interface"):
-            interface = interface.replace("Vsi-interface","Vsi")
-        elif interface.startswith("Vlan-interface"):
-            interface = interface.replace("Vlan-interface","Vlan-int")
+        for prefix, short in _IFACE_BY_FIRST.get(interface[:1], ()):
+            if interface.startswith(prefix):
+                return short + interface[len(prefix):]
         return interface
 
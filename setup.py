@@ -1,16 +1,11 @@
 """setup.py file"""
 
-import uuid
 import setuptools
-try:
-    from pip._internal.req import parse_requirements
-except ImportError:
-    from pip.req import parse_requirements
 
 __author__ = 'Steffen Walter <steffen.walter@atos.net>'
 
-install_reqs = parse_requirements('requirements.txt', session=uuid.uuid1())
-reqs = [str(ir.req) for ir in install_reqs]
+with open("requirements.txt", "r") as fh:
+    reqs = [line.strip() for line in fh if line.strip() and not line.startswith("#")]
 
 with open("README.md", "r") as fh:
     long_description = fh.read()
@@ -31,6 +26,7 @@ setuptools.setup(
         'Programming Language :: Python :: 3',
         'Operating System :: POSIX :: Linux',
     ],
+    python_requires=">=3.6",
     include_package_data=True,
     zip_safe=False,
     install_requires=reqs,
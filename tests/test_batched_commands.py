@@ -0,0 +1,113 @@
+"""Tests for the batched command channel protocol of FlexFabricDriver."""
+
+import unittest
+from unittest import mock
+
+from napalm_flexfabric import flexfabric
+from napalm_flexfabric.flexfabric import FlexFabricDriver
+
+
+class FakeDevice(object):
+    """Netmiko connection replaying scripted channel reads."""
+
+    base_prompt = "SW1"
+    RETURN = "\n"
+
+    def __init__(self, reads, outputs=None):
+        self.reads = list(reads)
+        self.outputs = outputs or {}
+        self.calls = []
+
+    def clear_buffer(self):
+        self.calls.append("clear_buffer")
+
+    def write_channel(self, data):
+        self.calls.append(("write_channel", data))
+
+    def read_channel(self):
+        return self.reads.pop(0) if self.reads else ""
+
+    def normalize_linefeeds(self, output):
+        return output.replace("\r\n", "\n")
+
+    def send_command(self, command):
+        self.calls.append(("send_command", command))
+        return self.outputs[command]
+
+
+@mock.patch.object(flexfabric, "_READ_DELAY", 0.01)
+class TestSendCommandsBatched(unittest.TestCase):
+
+    def driver(self, device, timeout=60):
+        driver = FlexFabricDriver("host", "user", "pass", timeout=timeout)
+        driver.device = device
+        return driver
+
+    def test_prompt_split_across_reads(self):
+        device = FakeDevice([
+            "display fan\r\nfan ok\r\n<S",
+            "W1>display environment\r\ntemp ok\r\n<SW",
+            "1>",
+        ])
+        outputs = self.driver(device)._send_commands_batched(
+            ["display fan", "display environment"]
+        )
+        self.assertEqual(outputs, ["fan ok", "temp ok"])
+        self.assertNotIn(("send_command", "display fan"), device.calls)
+        self.assertNotIn(("send_command", "display environment"), device.calls)
+
+    def test_wrong_echo_is_resent(self):
+        device = FakeDevice(
+            ["display fan\r\nfan ok\r\n<SW1>display clock\r\n12:00\r\n<SW1>"],
+            {"display environment": "temp ok"},
+        )
+        outputs = self.driver(device)._send_commands_batched(
+            ["display fan", "display environment"]
+        )
+        self.assertEqual(outputs, ["fan ok", "temp ok"])
+        self.assertEqual(
+            device.calls[-2:],
+            ["clear_buffer", ("send_command", "display environment")],
+        )
+
+    @mock.patch.object(flexfabric, "_QUIET_PERIOD", 0.5)
+    def test_late_output_after_timeout_is_read(self):
+        # the rest of "display environment" arrives after the timeout
+        # but before the channel went quiet
+        device = FakeDevice(
+            ["display fan\r\nfan ok\r\n<SW1>display environment\r\ntemp"]
+            + [""] * 25
+            + [" ok\r\n<SW1>"]
+        )
+        outputs = self.driver(device, timeout=0.2)._send_commands_batched(
+            ["display fan", "display environment"]
+        )
+        self.assertEqual(outputs, ["fan ok", "temp ok"])
+        self.assertNotIn(("send_command", "display environment"), device.calls)
+
+    @mock.patch.object(flexfabric, "_QUIET_PERIOD", 0.05)
+    def test_timeout_clears_buffer_before_resend(self):
+        device = FakeDevice(
+            ["display fan\r\nfan ok\r\n<SW1>display environment\r\ntemp"],
+            {"display environment": "temp ok"},
+        )
+        outputs = self.driver(device, timeout=0.05)._send_commands_batched(
+            ["display fan", "display environment"]
+        )
+        self.assertEqual(outputs, ["fan ok", "temp ok"])
+        self.assertEqual(
+            device.calls[-2:],
+            ["clear_buffer", ("send_command", "display environment")],
+        )
+
+    @mock.patch.object(flexfabric, "_QUIET_PERIOD", 0.5)
+    def test_output_that_never_settles_raises(self):
+        device = FakeDevice([])
+        device.read_channel = lambda: "fan\r\n"
+        driver = self.driver(device, timeout=0.01)
+        with self.assertRaises(flexfabric.CommandErrorException):
+            driver._send_commands_batched(["display fan", "display environment"])
+
+
+if __name__ == "__main__":
+    unittest.main()